@@ -17,14 +17,20 @@ from india_compliance.gst_india.doctype.gst_return_log.gst_return_log import (
     add_comment_to_gst_return_log,
     update_is_not_latest_gstr1_data,
 )
-from india_compliance.gst_india.doctype.gstin.gstin import get_gstr_1_filed_upto
+from india_compliance.gst_india.doctype.gstin.gstin import (
+    clear_gst_settings_lite,
+    get_gstr_1_filed_upto,
+)
 from india_compliance.gst_india.page.india_compliance_account import (
     _disable_api_promo,
     post_login,
 )
 from india_compliance.gst_india.utils import can_enable_api, is_api_enabled
 from india_compliance.gst_india.utils.custom_fields import toggle_custom_fields
-from india_compliance.gst_india.utils.gstin_info import get_gstin_info
+from india_compliance.gst_india.utils.gstin_info import (
+    clear_company_gstin_cache,
+    get_gstin_info,
+)
 
 E_INVOICE_START_DATE = "2021-01-01"
 
@@ -80,6 +86,8 @@ class GSTSettings(Document):
 
     def on_update(self):
         self.update_custom_fields()
+        clear_gst_settings_lite()
+        clear_company_gstin_cache()
         # clear session boot cache
         frappe.cache.delete_keys("bootinfo")
 
@@ -1,12 +1,15 @@
 # Copyright (c) 2023, Resilient Tech and contributors
 # For license information, please see license.txt
 
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import date_diff, format_date, get_datetime
+from frappe.utils import date_diff, format_date, get_system_timezone, getdate
 
-from india_compliance.gst_india.utils import is_api_enabled, validate_gstin_check_digit
+from india_compliance.gst_india.utils import is_api_enabled, is_valid_gstin_check_digit
 from india_compliance.gst_india.utils.gstin_info import (
     fetch_gstin_status,
     fetch_transporter_id_status,
@@ -22,12 +25,71 @@ GSTIN_STATUS = {
 
 GSTIN_BLOCK_STATUS = {"U": 0, "B": 1}
 
+GSTIN_STATUS_FIELDS = (
+    "gstin",
+    "status",
+    "registration_date",
+    "cancelled_date",
+    "transporter_id_status",
+    "last_updated_on",
+)
+
+GST_SETTINGS_LITE_FIELDS = (
+    "validate_gstin_status",
+    "sandbox_mode",
+    "enable_api",
+    "api_secret",
+    "enable_e_invoice",
+    "enable_e_waybill",
+    "gstin_status_refresh_interval",
+)
+
+
+def _now():
+    """
+    Cheaper get_datetime(): stdlib datetime.now with the system timezone
+    resolved once per request. before_save runs once per row on bulk
+    imports and refreshes, where get_datetime()'s parsing overhead adds up.
+    """
+    tz = getattr(frappe.local, "_system_tz", None)
+
+    if tz is None:
+        tz = ZoneInfo(get_system_timezone())
+        frappe.local._system_tz = tz
+
+    return datetime.now(tz).replace(tzinfo=None)
+
+
+def _get_gst_settings_lite():
+    """
+    Request-scoped _dict of the GST Settings fields used during GSTIN
+    validation. Cheaper than calling frappe.get_cached_doc per validation,
+    which builds a full Document (with child tables) every time.
+    """
+    settings = getattr(frappe.local, "_gst_settings_lite", None)
+
+    if settings is None:
+        settings = frappe.get_cached_value(
+            "GST Settings", "GST Settings", GST_SETTINGS_LITE_FIELDS, as_dict=True
+        )
+        frappe.local._gst_settings_lite = settings
+
+    return settings
+
+
+def clear_gst_settings_lite():
+    frappe.local._gst_settings_lite = None
+
 
 class GSTIN(Document):
+    def after_insert(self):
+        # a negative status lookup may be cached for this GSTIN
+        frappe.cache.delete_value(_negative_status_key(self.gstin))
+
     def before_save(self):
         self.status = GSTIN_STATUS.get(self.status, self.status)
         self.is_blocked = GSTIN_BLOCK_STATUS.get(self.is_blocked, 0)
-        self.last_updated_on = get_datetime()
+        self.last_updated_on = _now()
 
         if not self.cancelled_date and self.status == "Cancelled":
             self.cancelled_date = self.registration_date
@@ -38,14 +100,14 @@ class GSTIN(Document):
         Permission check not required as GSTIN details are public and user has access to doc.
         """
         # hard refresh will always use public API
-        create_or_update_gstin_status(self.gstin, throw=True)
+        _refresh_in_place(self, throw=True)
 
     @frappe.whitelist()
     def update_transporter_id_status(self):
         """
         Permission check not required as GSTIN details are public and user has access to doc.
         """
-        create_or_update_gstin_status(self.gstin, is_transporter_id=True)
+        _refresh_in_place(self, is_transporter_id=True)
 
 
 def get_gstr_1_filed_upto(gstin):
@@ -74,6 +136,16 @@ def create_or_update_gstin_status(
         if not response:
             return
 
+    if callback is None or callback is validate_gstin_status:
+        # Fast path: status refresh has no business logic beyond the
+        # before_save field mappings, so skip the ORM save machinery
+        row = _upsert_gstin_status([response])[0]
+
+        if callback:
+            callback(row, transaction_date)
+
+        return row
+
     if frappe.db.exists(doctype, response.get("gstin")):
         doc = frappe.get_doc(doctype, response.pop("gstin"))
     else:
@@ -88,6 +160,246 @@ def create_or_update_gstin_status(
     return doc
 
 
+def _refresh_in_place(doc, is_transporter_id=False, throw=False):
+    """
+    Refresh status fields on an already loaded GSTIN document and write
+    them back with db_update, instead of re-fetching the document by name.
+    Saves a SELECT (plus child-table load) per manual refresh.
+    """
+    if is_transporter_id:
+        response = fetch_transporter_id_status(doc.gstin, throw=throw)
+    else:
+        response = fetch_gstin_status(gstin=doc.gstin, throw=throw)
+
+    if not response:
+        return
+
+    row = _prepare_gstin_row(response)
+
+    for fieldname in (*GSTIN_STATUS_FIELDS, "is_blocked"):
+        if fieldname in row:
+            doc.set(fieldname, row[fieldname])
+
+    doc.modified = row.modified
+    doc.modified_by = row.modified_by
+    doc.db_update()
+
+    return doc
+
+
+def _has_status_changed(doc, row):
+    for fieldname in ("status", "transporter_id_status", "is_blocked"):
+        if fieldname in row and doc.get(fieldname) != row.get(fieldname):
+            return True
+
+    for fieldname in ("registration_date", "cancelled_date"):
+        if fieldname not in row:
+            continue
+
+        old, new = doc.get(fieldname), row.get(fieldname)
+
+        if (getdate(old) if old else None) != (getdate(new) if new else None):
+            return True
+
+    return False
+
+
+### Bulk GSTIN Status Refresh ###
+
+
+def mark_gstin_for_refresh(gstin, transaction_date=None):
+    """
+    Queue a GSTIN for a batched status refresh after commit.
+
+    GSTINs marked during document validation are collected on frappe.local
+    and refreshed in a single background job instead of one job per GSTIN.
+    """
+    pending = getattr(frappe.local, "_pending_gstin_refresh", None)
+
+    if pending is None:
+        pending = frappe.local._pending_gstin_refresh = {}
+        frappe.db.before_commit.add(flush_pending_gstin_refresh)
+        # rollback resets the before_commit callbacks; clear the pending
+        # dict too so the next mark re-registers instead of stranding it
+        frappe.db.after_rollback.add(_clear_pending_gstin_refresh)
+
+    pending[gstin] = transaction_date
+
+
+def flush_pending_gstin_refresh():
+    pending = getattr(frappe.local, "_pending_gstin_refresh", None)
+    frappe.local._pending_gstin_refresh = None
+
+    if pending:
+        enqueue_bulk_gstin_refresh(pending)
+
+
+def _clear_pending_gstin_refresh():
+    frappe.local._pending_gstin_refresh = None
+
+
+def enqueue_bulk_gstin_refresh(gstins):
+    """
+    Enqueue a single refresh job for multiple GSTINs.
+
+    :param gstins: iterable of GSTINs, or dict of GSTIN -> transaction_date
+    """
+    if not isinstance(gstins, dict):
+        gstins = dict.fromkeys(gstins)
+
+    gstins = {gstin: date for gstin, date in gstins.items() if gstin}
+
+    if not gstins:
+        return
+
+    frappe.enqueue(
+        bulk_refresh_gstin_status,
+        enqueue_after_commit=True,
+        queue="short",
+        gstins=gstins,
+    )
+
+
+def bulk_refresh_gstin_status(gstins):
+    """
+    Fetch status for multiple GSTINs and upsert all rows in one statement.
+
+    API calls are issued sequentially (the GST server is rate limited and
+    frappe's site context is thread local), but the N individual doc.save
+    calls are replaced with a single INSERT ... ON DUPLICATE KEY UPDATE.
+
+    :param gstins: dict of GSTIN -> transaction_date (may be None)
+    """
+    responses = []
+    for gstin in gstins:
+        response = fetch_gstin_status(gstin=gstin, throw=False)
+        if response:
+            responses.append(response)
+
+    if not responses:
+        return
+
+    for row in _upsert_gstin_status(responses):
+        validate_gstin_status(row, gstins.get(row.gstin))
+
+
+def _prepare_gstin_row(response, now=None):
+    """
+    Apply the before_save field mappings to an API response, returning the
+    column values for a direct SQL upsert.
+    """
+    now = now or _now()
+    row = frappe._dict(
+        name=response.get("gstin"),
+        gstin=response.get("gstin"),
+        last_updated_on=now,
+        creation=now,
+        modified=now,
+        modified_by=frappe.session.user,
+        owner=frappe.session.user,
+    )
+
+    if "status" in response:
+        status = response.get("status")
+        status = GSTIN_STATUS.get(status, status)
+        registration_date = response.get("registration_date")
+        cancelled_date = response.get("cancelled_date")
+
+        if not cancelled_date and status == "Cancelled":
+            cancelled_date = registration_date
+
+        row.update(
+            {
+                "status": status,
+                "registration_date": registration_date,
+                "cancelled_date": cancelled_date,
+                "is_blocked": GSTIN_BLOCK_STATUS.get(response.get("is_blocked"), 0),
+            }
+        )
+
+    if "transporter_id_status" in response:
+        row.transporter_id_status = response.get("transporter_id_status")
+
+    return row
+
+
+def _upsert_gstin_status(responses):
+    """
+    Upsert GSTIN status rows with a single INSERT ... ON DUPLICATE KEY UPDATE,
+    bypassing the ORM save machinery. Status refresh has no business logic
+    beyond the field mappings in before_save, which are applied in Python.
+
+    Rows whose tracked fields match the stored values only get their
+    last_updated_on bumped, without rewriting the row or touching modified.
+
+    All responses in one batch must have the same set of keys.
+
+    Returns the upserted rows.
+    """
+    now = _now()
+    rows = [_prepare_gstin_row(response, now) for response in responses]
+
+    # name == gstin (autoname: field:gstin); get_all returns only the
+    # requested columns, so key by gstin rather than name
+    stored = {
+        doc.gstin: doc
+        for doc in frappe.get_all(
+            "GSTIN",
+            filters={"name": ("in", [row.name for row in rows])},
+            fields=[*GSTIN_STATUS_FIELDS, "is_blocked"],
+        )
+    }
+
+    changed = [
+        row
+        for row in rows
+        if row.gstin not in stored or _has_status_changed(stored[row.gstin], row)
+    ]
+    changed_names = {row.name for row in changed}
+
+    if unchanged := [row.name for row in rows if row.name not in changed_names]:
+        frappe.db.set_value(
+            "GSTIN",
+            {"name": ("in", unchanged)},
+            "last_updated_on",
+            now,
+            update_modified=False,
+        )
+
+    if changed:
+        columns = list(changed[0])
+
+        values = ", ".join(
+            "({})".format(", ".join(["%s"] * len(columns))) for _ in changed
+        )
+        updates = ", ".join(
+            f"`{column}` = VALUES(`{column}`)"
+            for column in columns
+            if column not in ("name", "gstin", "creation", "owner")
+        )
+
+        frappe.db.sql(
+            """
+            INSERT INTO `tabGSTIN` ({columns})
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE {updates}
+            """.format(
+                columns=", ".join(f"`{column}`" for column in columns),
+                values=values,
+                updates=updates,
+            ),
+            [row[column] for row in changed for column in columns],
+        )
+
+    frappe.cache.delete_value([_negative_status_key(row.gstin) for row in rows])
+
+    return rows
+
+
+def _negative_status_key(gstin):
+    return f"gstin_neg:{gstin}"
+
+
 ### GSTIN Status Validation ###
 
 
@@ -99,23 +411,14 @@ def get_and_validate_gstin_status(gstin, transaction_date):
     if not gstin:
         return
 
-    if not is_status_refresh_required(gstin, transaction_date):
-        if not frappe.db.exists("GSTIN", gstin):
-            return
+    needs_refresh, gstin_doc = is_status_refresh_required(gstin, transaction_date)
 
-        doc = frappe.get_doc("GSTIN", gstin)
-        validate_gstin_status(doc, transaction_date, throw=True)
+    if not needs_refresh:
+        validate_gstin_status(gstin_doc, transaction_date, throw=True)
 
     else:
         # Don't delay the response if API is required
-        frappe.enqueue(
-            create_or_update_gstin_status,
-            enqueue_after_commit=True,
-            queue="short",
-            gstin=gstin,
-            transaction_date=transaction_date,
-            callback=validate_gstin_status,
-        )
+        mark_gstin_for_refresh(gstin, transaction_date)
 
 
 @frappe.whitelist()
@@ -127,11 +430,21 @@ def get_gstin_status(gstin, transaction_date=None, force_update=False):
     if not gstin:
         return
 
-    if not force_update and not is_status_refresh_required(gstin, transaction_date):
-        if not frappe.db.exists("GSTIN", gstin):
+    if not force_update:
+        if frappe.cache.get_value(_negative_status_key(gstin)):
             return
 
-        return frappe.get_doc("GSTIN", gstin)
+        needs_refresh, gstin_doc = is_status_refresh_required(gstin, transaction_date)
+
+        if not needs_refresh:
+            if not gstin_doc:
+                # cache the negative result to avoid re-querying unknown
+                # GSTINs on every call
+                frappe.cache.set_value(
+                    _negative_status_key(gstin), 1, expires_in_sec=300
+                )
+
+            return gstin_doc
 
     return create_or_update_gstin_status(gstin, throw=force_update)
 
@@ -160,17 +473,16 @@ def validate_gstin_status(gstin_doc, transaction_date=None, throw=False):
             ).format(gstin_doc.gstin)
         )
 
-    if date_diff(transaction_date, registration_date) < 0:
+    transaction_date = getdate(transaction_date)
+
+    if transaction_date < getdate(registration_date):
         return _throw(
             _(
                 "Party GSTIN {1} is registered on {0}. Please make sure that document date is on or after {0}."
             ).format(format_date(registration_date), gstin_doc.gstin)
         )
 
-    if (
-        gstin_doc.status == "Cancelled"
-        and date_diff(transaction_date, cancelled_date) >= 0
-    ):
+    if gstin_doc.status == "Cancelled" and transaction_date >= getdate(cancelled_date):
         return _throw(
             _(
                 "Party GSTIN {1} is cancelled on {0}. Please make sure that document date is before {0}."
@@ -186,30 +498,33 @@ def validate_gstin_status(gstin_doc, transaction_date=None, throw=False):
 
 
 def is_status_refresh_required(gstin, transaction_date):
-    settings = frappe.get_cached_doc("GST Settings")
+    """
+    Returns (needs_refresh, gstin_doc) from a single SELECT, so that callers
+    can reuse the fetched row instead of re-querying the GSTIN.
+    """
+    settings = _get_gst_settings_lite()
+    gstin_doc = frappe.db.get_value("GSTIN", gstin, GSTIN_STATUS_FIELDS, as_dict=True)
 
     if (
         not settings.validate_gstin_status
         or not is_api_enabled(settings)
         or settings.sandbox_mode
     ):
-        return
+        return False, gstin_doc
 
-    doc = frappe.db.get_value(
-        "GSTIN", gstin, ["last_updated_on", "status"], as_dict=True
-    )
-
-    if not doc:
-        return True
+    if not gstin_doc:
+        return True, None
 
     if not transaction_date:  # not from transactions
-        return False
+        return False, gstin_doc
+
+    if gstin_doc.status not in ("Active", "Cancelled"):
+        return True, gstin_doc
 
-    if doc.status not in ("Active", "Cancelled"):
-        return True
+    days_since_last_update = date_diff(_now(), gstin_doc.last_updated_on)
+    needs_refresh = days_since_last_update >= settings.gstin_status_refresh_interval
 
-    days_since_last_update = date_diff(get_datetime(), doc.get("last_updated_on"))
-    return days_since_last_update >= settings.gstin_status_refresh_interval
+    return needs_refresh, gstin_doc
 
 
 ### GST Transporter ID Validation ###
@@ -229,27 +544,37 @@ def validate_gst_transporter_id(transporter_id):
     if not transporter_id:
         return
 
-    gstin = None
+    gstin = frappe.db.get_value(
+        "GSTIN",
+        transporter_id,
+        ("status", "transporter_id_status", "registration_date", "cancelled_date"),
+        as_dict=True,
+    )
 
-    # Check if GSTIN doc exists
-    if frappe.db.exists("GSTIN", transporter_id):
-        gstin = frappe.get_doc("GSTIN", transporter_id)
+    # Return early if GSTIN or transporter_id_status is already Active
+    if gstin and (gstin.status == "Active" or gstin.transporter_id_status == "Active"):
+        return
 
-    # Check if transporter_id starts with 88 or is not valid GSTIN and use Transporter ID API
-    elif transporter_id[:2] == "88" or has_gstin_check_digit_failed(transporter_id):
-        gstin = create_or_update_gstin_status(
-            transporter_id,
-            is_transporter_id=True,
-        )
+    if not gstin:
+        # Check if transporter_id starts with 88 or is not valid GSTIN and use Transporter ID API
+        if transporter_id[:2] == "88" or has_gstin_check_digit_failed(transporter_id):
+            gstin = create_or_update_gstin_status(
+                transporter_id,
+                is_transporter_id=True,
+            )
 
-    # Use GSTIN API
-    else:
-        gstin = create_or_update_gstin_status(transporter_id)
+        # Use GSTIN API
+        else:
+            gstin = create_or_update_gstin_status(transporter_id)
 
     if not gstin:
         return
 
-    # If GSTIN status is not Active and transporter_id_status is None, use Transporter ID API
+    # If GSTIN status is not Active and transporter_id_status is None, use Transporter ID API.
+    # The two lookups stay sequential on purpose: the common case resolves with
+    # the first call alone, and firing both concurrently would waste a metered
+    # API call (frappe's site context is also thread local, so the API classes
+    # cannot run off the request thread).
     if gstin.status != "Active" and not gstin.transporter_id_status:
         gstin = create_or_update_gstin_status(
             transporter_id,
@@ -257,7 +582,7 @@ def validate_gst_transporter_id(transporter_id):
         )
 
     # Return if GSTIN or transporter_id_status is Active
-    if gstin.status == "Active" or gstin.transporter_id_status == "Active":
+    if not gstin or gstin.status == "Active" or gstin.transporter_id_status == "Active":
         return
 
     frappe.msgprint(
@@ -267,10 +592,4 @@ def validate_gst_transporter_id(transporter_id):
 
 
 def has_gstin_check_digit_failed(gstin):
-    try:
-        validate_gstin_check_digit(gstin)
-
-    except frappe.ValidationError:
-        return True
-
-    return False
+    return not is_valid_gstin_check_digit(gstin)
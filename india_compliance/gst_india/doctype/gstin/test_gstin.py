@@ -1,14 +1,33 @@
 # Copyright (c) 2023, Resilient Tech and Contributors
 # See license.txt
+from unittest.mock import patch
+
 import responses
 from responses import matchers
 
 import frappe
 from frappe.tests import IntegrationTestCase, change_settings
+from frappe.utils import getdate
 
-from india_compliance.gst_india.doctype.gstin.gstin import validate_gst_transporter_id
+from india_compliance.gst_india.doctype.gstin.gstin import (
+    _negative_status_key,
+    _upsert_gstin_status,
+    flush_pending_gstin_refresh,
+    get_gstin_status,
+    mark_gstin_for_refresh,
+    validate_gst_transporter_id,
+)
 
 TEST_GSTIN = "24AANFA2641L1ZK"
+OTHER_GSTIN = "29AABCF8078M2ZW"
+
+UPSERT_FIELDS = (
+    "status",
+    "registration_date",
+    "cancelled_date",
+    "is_blocked",
+    "transporter_id_status",
+)
 
 TRANSPORTER_ID_API_RESPONSE = {
     "success": True,
@@ -40,6 +59,114 @@ class TestGSTIN(IntegrationTestCase):
 
         validate_gst_transporter_id(TEST_GSTIN)
 
+    def test_upsert_parity_with_orm_save(self):
+        insert_response = frappe._dict(
+            gstin=TEST_GSTIN,
+            status="ACT",
+            registration_date=getdate("2021-01-01"),
+            cancelled_date=None,
+        )
+        update_response = frappe._dict(
+            gstin=TEST_GSTIN,
+            status="CNL",
+            registration_date=getdate("2021-01-01"),
+            cancelled_date=None,
+        )
+
+        def get_row():
+            return frappe.db.get_value(
+                "GSTIN", TEST_GSTIN, UPSERT_FIELDS, as_dict=True
+            )
+
+        def save_via_orm(response):
+            response = response.copy()
+            if frappe.db.exists("GSTIN", response.get("gstin")):
+                doc = frappe.get_doc("GSTIN", response.pop("gstin"))
+            else:
+                doc = frappe.new_doc("GSTIN")
+
+            doc.update(response)
+            doc.save(ignore_permissions=True)
+
+        frappe.db.delete("GSTIN", {"name": TEST_GSTIN})
+
+        # insert
+        save_via_orm(insert_response)
+        orm_row = get_row()
+
+        frappe.db.delete("GSTIN", {"name": TEST_GSTIN})
+        _upsert_gstin_status([insert_response.copy()])
+        self.assertEqual(get_row(), orm_row)
+
+        # update (includes status mapping and cancelled_date fallback)
+        save_via_orm(update_response)
+        orm_row = get_row()
+
+        frappe.db.delete("GSTIN", {"name": TEST_GSTIN})
+        _upsert_gstin_status([insert_response.copy()])
+        _upsert_gstin_status([update_response.copy()])
+        self.assertEqual(get_row(), orm_row)
+
+    def test_noop_upsert_bumps_only_last_updated_on(self):
+        response = frappe._dict(
+            gstin=TEST_GSTIN,
+            status="ACT",
+            registration_date=getdate("2021-01-01"),
+            cancelled_date=None,
+        )
+
+        def get_row():
+            return frappe.db.get_value(
+                "GSTIN", TEST_GSTIN, ["modified", "last_updated_on"], as_dict=True
+            )
+
+        frappe.db.delete("GSTIN", {"name": TEST_GSTIN})
+        _upsert_gstin_status([response.copy()])
+        before = get_row()
+
+        # identical re-upsert must not rewrite the row
+        _upsert_gstin_status([response.copy()])
+        after = get_row()
+
+        self.assertEqual(after.modified, before.modified)
+        self.assertGreater(after.last_updated_on, before.last_updated_on)
+
+    def test_flush_pending_gstin_refresh_enqueues_single_job(self):
+        frappe.local._pending_gstin_refresh = None
+
+        mark_gstin_for_refresh(TEST_GSTIN, "2024-01-01")
+        mark_gstin_for_refresh(TEST_GSTIN, "2024-01-02")  # dedupes
+        mark_gstin_for_refresh(OTHER_GSTIN)
+
+        with patch("frappe.enqueue") as mock_enqueue:
+            flush_pending_gstin_refresh()
+
+        mock_enqueue.assert_called_once()
+        gstins = mock_enqueue.call_args.kwargs["gstins"]
+        self.assertEqual(set(gstins), {TEST_GSTIN, OTHER_GSTIN})
+        self.assertEqual(gstins[TEST_GSTIN], "2024-01-02")
+        self.assertIsNone(frappe.local._pending_gstin_refresh)
+
+    @change_settings("GST Settings", {"validate_gstin_status": 0})
+    def test_negative_status_cache(self):
+        frappe.db.delete("GSTIN", {"name": TEST_GSTIN})
+        frappe.cache.delete_value(_negative_status_key(TEST_GSTIN))
+
+        # miss caches the negative result
+        self.assertIsNone(get_gstin_status(TEST_GSTIN))
+        self.assertTrue(frappe.cache.get_value(_negative_status_key(TEST_GSTIN)))
+
+        # cleared when the GSTIN is created
+        frappe.get_doc(
+            {"doctype": "GSTIN", "gstin": TEST_GSTIN, "status": "Active"}
+        ).insert(ignore_permissions=True)
+        self.assertFalse(frappe.cache.get_value(_negative_status_key(TEST_GSTIN)))
+
+        # and when written via the SQL upsert
+        frappe.cache.set_value(_negative_status_key(TEST_GSTIN), 1)
+        _upsert_gstin_status([frappe._dict(gstin=TEST_GSTIN, status="ACT")])
+        self.assertFalse(frappe.cache.get_value(_negative_status_key(TEST_GSTIN)))
+
     def mock_get_transporter_details_response(self):
         url = "https://asp.resilient.tech/ewb/Master/GetTransporterDetails"
 
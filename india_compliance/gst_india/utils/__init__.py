@@ -1,6 +1,7 @@
 import copy
 import io
 import tarfile
+from functools import lru_cache
 
 from dateutil import parser
 from pytz import timezone
@@ -326,9 +327,13 @@ def get_data_file_path(file_name):
     return frappe.get_app_path("india_compliance", "gst_india", "data", file_name)
 
 
-def validate_gstin_check_digit(gstin, label="GSTIN"):
+@lru_cache(maxsize=4096)
+def is_valid_gstin_check_digit(gstin):
     """
-    Function to validate the check digit of the GSTIN.
+    Compute and verify the check digit of the GSTIN.
+
+    Pure function; results are cached for the process lifetime since the
+    same GSTIN is often validated repeatedly within a request.
     """
     factor = 1
     total = 0
@@ -340,7 +345,15 @@ def validate_gstin_check_digit(gstin, label="GSTIN"):
         digit = (digit // mod) + (digit % mod)
         total += digit
         factor = 2 if factor == 1 else 1
-    if gstin[-1] != code_point_chars[((mod - (total % mod)) % mod)]:
+
+    return gstin[-1] == code_point_chars[((mod - (total % mod)) % mod)]
+
+
+def validate_gstin_check_digit(gstin, label="GSTIN"):
+    """
+    Function to validate the check digit of the GSTIN.
+    """
+    if not is_valid_gstin_check_digit(gstin):
         frappe.throw(
             _(
                 """Invalid {0}! The check digit validation has failed. Please ensure you've typed the {0} correctly."""
@@ -35,6 +35,45 @@ KEYS_TO_FILTER_DUPLICATES = frozenset(("dst", "bnm", "st", "loc", "city"))
 CHARACTERS_TO_STRIP = f"{whitespace},"
 
 
+def is_gst_server_down():
+    """
+    Request-scoped read of the gst_server_error flag, so that batch
+    validation doesn't hit Redis once per GSTIN.
+    """
+    is_down = getattr(frappe.local, "_gst_server_error", None)
+
+    if is_down is None:
+        is_down = bool(frappe.cache.get_value("gst_server_error"))
+        frappe.local._gst_server_error = is_down
+
+    return is_down
+
+
+def set_gst_server_down():
+    frappe.local._gst_server_error = True
+    frappe.cache.set_value("gst_server_error", True, expires_in_sec=60)
+
+
+def log_gstin_fetch_error(title, exc):
+    """
+    Log at most one Error Log per error class per minute.
+
+    During a GST server outage every GSTIN validation fails the same way;
+    capturing a traceback and inserting an Error Log row per failure just
+    floods the table. Server errors are expected and already flagged via
+    the gst_server_error cache, so they skip the traceback capture too.
+    """
+    throttle_key = f"gstin_error_logged:{type(exc).__name__}"
+
+    if frappe.cache.get_value(throttle_key):
+        return
+
+    frappe.cache.set_value(throttle_key, 1, expires_in_sec=60)
+
+    message = str(exc) if isinstance(exc, GSPServerError) else frappe.get_traceback()
+    frappe.log_error(title=title, message=message)
+
+
 @frappe.whitelist()
 def get_gstin_info(gstin, *, throw_error=True):
     if not frappe.get_cached_doc("User", frappe.session.user).has_desk_access():
@@ -49,7 +88,7 @@ def _get_gstin_info(gstin, *, throw_error=True):
 
     if not response:
         try:
-            if frappe.cache.get_value("gst_server_error"):
+            if is_gst_server_down():
                 return frappe._dict()
 
             response = PublicAPI().get_gstin_info(gstin)
@@ -60,12 +99,12 @@ def _get_gstin_info(gstin, *, throw_error=True):
             )
         except Exception as exc:
             if isinstance(exc, GSPServerError):
-                frappe.cache.set_value("gst_server_error", True, expires_in_sec=60)
+                set_gst_server_down()
 
             if throw_error:
                 raise exc
 
-            frappe.log_error(title="Failed to Fetch GSTIN Info", message=exc)
+            log_gstin_fetch_error("Failed to Fetch GSTIN Info", exc)
             frappe.clear_last_message()
             return frappe._dict()
 
@@ -177,6 +216,35 @@ def _extract_address_lines(address):
     return address_line1, address_line2
 
 
+_MISSING = object()
+
+
+def get_company_gstin(service):
+    """
+    Request-scoped lookup of the company GSTIN with credentials for a service.
+
+    Avoids re-loading the full GST Settings document (and scanning its
+    credentials child table) on every GSTIN validation within a request.
+    """
+    cache = getattr(frappe.local, "_company_gstin", None)
+
+    if cache is None:
+        cache = frappe.local._company_gstin = {}
+
+    company_gstin = cache.get(service, _MISSING)
+
+    if company_gstin is _MISSING:
+        gst_settings = frappe.get_cached_doc("GST Settings", None)
+        company_gstin = gst_settings.get_gstin_with_credentials(service=service)
+        cache[service] = company_gstin
+
+    return company_gstin
+
+
+def clear_company_gstin_cache():
+    frappe.local._company_gstin = None
+
+
 def fetch_gstin_status(*, gstin=None, throw=True):
     """
     Fetch GSTIN status from E-Invoice API or Public API
@@ -189,11 +257,10 @@ def fetch_gstin_status(*, gstin=None, throw=True):
     validate_gstin(gstin)
 
     try:
-        if not throw and frappe.cache.get_value("gst_server_error"):
+        if not throw and is_gst_server_down():
             return
 
-        gst_settings = frappe.get_cached_doc("GST Settings", None)
-        company_gstin = gst_settings.get_gstin_with_credentials(service="e-Invoice")
+        company_gstin = get_company_gstin("e-Invoice")
 
         if throw or not company_gstin:
             response = PublicAPI().get_gstin_info(gstin)
@@ -215,12 +282,9 @@ def fetch_gstin_status(*, gstin=None, throw=True):
             raise e
 
         if isinstance(e, GSPServerError):
-            frappe.cache.set_value("gst_server_error", True, expires_in_sec=60)
+            set_gst_server_down()
 
-        frappe.log_error(
-            title=_("Error fetching GSTIN status"),
-            message=frappe.get_traceback(),
-        )
+        log_gstin_fetch_error(_("Error fetching GSTIN status"), e)
         frappe.clear_last_message()
 
 
@@ -252,8 +316,7 @@ def fetch_transporter_id_status(transporter_id, throw=True):
     if not frappe.get_cached_value("GST Settings", None, "enable_e_waybill"):
         return
 
-    gst_settings = frappe.get_cached_doc("GST Settings", None)
-    company_gstin = gst_settings.get_gstin_with_credentials(service="e-Waybill")
+    company_gstin = get_company_gstin("e-Waybill")
 
     if not company_gstin:
         return
@@ -267,10 +330,7 @@ def fetch_transporter_id_status(transporter_id, throw=True):
         if throw:
             raise e
 
-        frappe.log_error(
-            title=_("Error fetching Transporter ID status"),
-            message=frappe.get_traceback(),
-        )
+        log_gstin_fetch_error(_("Error fetching Transporter ID status"), e)
         frappe.clear_last_message()
         return
 
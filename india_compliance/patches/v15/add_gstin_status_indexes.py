@@ -0,0 +1,5 @@
+import frappe
+
+
+def execute():
+    frappe.db.add_index("GSTIN", ["status", "last_updated_on"])